@@ -4,8 +4,9 @@ dspy_sig_introspect.py
 
 Usage:
     python dspy_sig_introspect.py path/to/file.py
+    python dspy_sig_introspect.py --server
 
-Prints JSON of the form:
+Prints JSON of the form (in --server mode, one line per path read from stdin):
 
 {
   "file": "/abs/path/to/file.py",
@@ -16,41 +17,81 @@ Prints JSON of the form:
 """
 
 import ast
+import hashlib
 import json
+import os
 import pathlib
+import random
 import sys
-from dataclasses import dataclass, asdict
-from typing import Dict, List, Literal, Optional
+import tempfile
+import traceback
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 
 
 FieldKind = Literal["input", "output"]
-RECOGNIZED_DSPY_MODULES = {
-    "Predict",
-    "ReAct",
-    "ChainOfThought",
-    "CodeAct",
-    "MultiChainComparison",
-    "ProgramOfThought",
+RECOGNIZED_DSPY_MODULES = frozenset(
+    {
+        "Predict",
+        "ReAct",
+        "ChainOfThought",
+        "CodeAct",
+        "MultiChainComparison",
+        "ProgramOfThought",
+    }
+)
+# A file can only contribute output if it mentions one of these names
+PREFILTER_MARKERS = tuple(
+    name.encode("ascii") for name in ("Signature", *sorted(RECOGNIZED_DSPY_MODULES))
+)
+FIELD_CALL_KINDS: Dict[str, FieldKind] = {
+    "InputField": "input",
+    "OutputField": "output",
 }
 
 
-@dataclass
+# Many of these objects are created per file, so they are slotted. Python
+# 3.10+ uses dataclass(slots=True); older interpreters get the same result
+# from _add_slots below. (A __slots__ tuple in the class body would be read
+# as a defaulted field by mypyc.)
+DATACLASS_OPTIONS: Dict[str, Any] = (
+    {"slots": True} if sys.version_info >= (3, 10) else {}
+)
+
+
+@dataclass(**DATACLASS_OPTIONS)
 class FieldInfo:
     name: str
     kind: FieldKind
     annotation: Optional[str]
     description: Optional[str]
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "annotation": self.annotation,
+            "description": self.description,
+        }
 
-@dataclass
+
+@dataclass(**DATACLASS_OPTIONS)
 class SignatureInfo:
     name: str
     inputs: List[FieldInfo]
     outputs: List[FieldInfo]
     docstring: Optional[str]
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "docstring": self.docstring,
+            "inputs": [f.to_dict() for f in self.inputs],
+            "outputs": [f.to_dict() for f in self.outputs],
+        }
+
 
-@dataclass
+@dataclass(**DATACLASS_OPTIONS)
 class ModuleInfo:
     """A DSPy module / predictor variable, e.g. my_predict = dspy.Predict(MySignature)."""
 
@@ -59,8 +100,16 @@ class ModuleInfo:
     line: int
     column: int  # 1-based
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "signature": self.signature,
+            "line": self.line,
+            "column": self.column,
+        }
+
 
-@dataclass
+@dataclass(**DATACLASS_OPTIONS)
 class PredictionInfo:
     """A variable that holds the result of calling a DSPy module, e.g. result = my_predict(...)."""
 
@@ -69,8 +118,37 @@ class PredictionInfo:
     line: int
     column: int  # 1-based
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "signature": self.signature,
+            "line": self.line,
+            "column": self.column,
+        }
 
-class DSpyIntrospector(ast.NodeVisitor):
+
+if sys.version_info < (3, 10):
+
+    def _add_slots(cls: Any) -> Any:
+        """
+        Rebuild a dataclass with __slots__, as dataclass(slots=True) does.
+        """
+        names = tuple(f.name for f in fields(cls))
+        namespace = {
+            key: value
+            for key, value in cls.__dict__.items()
+            if key not in names and key not in ("__dict__", "__weakref__")
+        }
+        namespace["__slots__"] = names
+        return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+    FieldInfo = _add_slots(FieldInfo)
+    SignatureInfo = _add_slots(SignatureInfo)
+    ModuleInfo = _add_slots(ModuleInfo)
+    PredictionInfo = _add_slots(PredictionInfo)
+
+
+class DSpyIntrospector:
     def __init__(self, filename: str) -> None:
         self.filename = filename
         self.signatures: Dict[str, SignatureInfo] = {}
@@ -84,21 +162,19 @@ class DSpyIntrospector(ast.NodeVisitor):
         Best-effort stringify for simple Name/Attribute nodes.
         Returns dotted identifier like 'self.predict' when possible.
         """
+        # Plain Name/Attribute chains are joined directly; ast.unparse is only
+        # needed for anything fancier, e.g. self.items[0].predict
+        parts = []
+        cur: ast.AST = node
+        while type(cur) is ast.Attribute:
+            parts.append(cur.attr)
+            cur = cur.value
+        if type(cur) is ast.Name:
+            parts.append(cur.id)
+            return ".".join(reversed(parts))
         try:
-            return ast.unparse(node)  # type: ignore[attr-defined]
+            return ast.unparse(node)
         except Exception:
-            if isinstance(node, ast.Name):
-                return node.id
-            if isinstance(node, ast.Attribute):
-                # Fallback manual join for Attribute chains
-                parts = []
-                cur: Optional[ast.AST] = node
-                while isinstance(cur, ast.Attribute):
-                    parts.append(cur.attr)
-                    cur = cur.value  # type: ignore[assignment]
-                if isinstance(cur, ast.Name):
-                    parts.append(cur.id)
-                    return ".".join(reversed(parts))
             return None
 
     def _parse_signature_side(self, side_text: str, kind: FieldKind) -> List[FieldInfo]:
@@ -113,30 +189,49 @@ class DSpyIntrospector(ast.NodeVisitor):
         if not side:
             return []
 
-        # If exactly one colon on the side, treat it as a group annotation
-        if side.count(":") == 1:
-            names_part, type_part = side.split(":", 1)
-            annotation = type_part.strip() or "Any"
-            names = [n.strip() for n in names_part.split(",") if n.strip()]
-            return [
-                FieldInfo(name=name, kind=kind, annotation=annotation, description=None)
-                for name in names
-            ]
-
-        # Otherwise, parse per-item (each item may or may not have its own annotation)
-        fields: List[FieldInfo] = []
-        for token in (t.strip() for t in side.split(",") if t.strip()):
-            if ":" in token:
-                name_part, type_part = token.split(":", 1)
-                name = name_part.strip()
-                annotation = type_part.strip() or "Any"
-            else:
-                name = token
-                annotation = "Any"
-            fields.append(
-                FieldInfo(name=name, kind=kind, annotation=annotation, description=None)
+        pairs = self._split_fields(side)
+
+        # A single annotation after a comma-separated list is a group
+        # annotation for the names up to it: "a, b: str, c" -> a, b are str
+        annotated = [i for i, (_, annotation) in enumerate(pairs) if annotation]
+        if len(annotated) == 1:
+            last = annotated[0]
+            group = pairs[last][1]
+            pairs = [(name, group) for name, _ in pairs[:last]] + pairs[last:]
+
+        # Field names and annotations repeat heavily across signatures (and
+        # across files in --server mode), so share one copy of each string.
+        intern = sys.intern
+        return [
+            FieldInfo(
+                name=intern(name),
+                kind=kind,
+                annotation=intern(annotation.strip() or "Any"),
+                description=None,
             )
-        return fields
+            for name, annotation in pairs
+        ]
+
+    def _split_fields(self, side: str) -> List[Tuple[str, str]]:
+        """
+        Bracket-aware split of a signature side into (name, annotation) pairs.
+        Only commas outside [...] separate fields.
+        """
+        pairs: List[Tuple[str, str]] = []
+        pending = ""
+        for piece in side.split(","):
+            pending = f"{pending},{piece}" if pending else piece
+            if pending.count("[") > pending.count("]"):
+                continue
+            name, _, annotation = pending.partition(":")
+            if name.strip():
+                pairs.append((name.strip(), annotation.strip()))
+            pending = ""
+        if pending.strip():
+            # Unbalanced brackets (half-typed): keep what we have
+            name, _, annotation = pending.partition(":")
+            pairs.append((name.strip(), annotation.strip()))
+        return pairs
 
     def _parse_inline_signature(self, text: str) -> SignatureInfo:
         """
@@ -153,68 +248,59 @@ class DSpyIntrospector(ast.NodeVisitor):
         outputs = self._parse_signature_side(right, "output")
         return SignatureInfo(name=raw, inputs=inputs, outputs=outputs, docstring=None)
 
-    def _is_dspy_signature_base(self, node: ast.AST) -> bool:
-        """
-        Match: class X(dspy.Signature) or class X(Signature)
-        """
-        if isinstance(node, ast.Attribute):
-            # e.g. dspy.Signature
-            return node.attr == "Signature"
-        if isinstance(node, ast.Name):
-            # e.g. Signature
-            return node.id == "Signature"
-        return False
-
-    def _is_input_field_call(self, node: ast.expr) -> bool:
+    def _classify_field_call(self, node: ast.Call) -> Optional[FieldKind]:
         """
-        Match: dspy.InputField(...) or InputField(...)
+        Match: dspy.InputField(...) / InputField(...) -> "input"
+               dspy.OutputField(...) / OutputField(...) -> "output"
         """
-        if isinstance(node, ast.Call):
-            func = node.func
-            if isinstance(func, ast.Attribute):
-                return func.attr == "InputField"
-            if isinstance(func, ast.Name):
-                return func.id == "InputField"
-        return False
+        func = node.func
+        if type(func) is ast.Attribute:
+            name = func.attr
+        elif type(func) is ast.Name:
+            name = func.id
+        else:
+            return None
+        return FIELD_CALL_KINDS.get(name)
 
-    def _is_output_field_call(self, node: ast.expr) -> bool:
+    def _simple_expr_str(self, node: ast.expr) -> Optional[str]:
         """
-        Match: dspy.OutputField(...) or OutputField(...)
+        Fast path for one-level attributes (typing.List) so that ast.unparse
+        only runs for genuinely complex expressions. Callers handle bare
+        names and string constants themselves.
         """
-        if isinstance(node, ast.Call):
-            func = node.func
-            if isinstance(func, ast.Attribute):
-                return func.attr == "OutputField"
-            if isinstance(func, ast.Name):
-                return func.id == "OutputField"
-        return False
+        if type(node) is ast.Attribute and type(node.value) is ast.Name:
+            return f"{node.value.id}.{node.attr}"
+        return None
 
     def _annotation_str(self, node: Optional[ast.expr]) -> Optional[str]:
         if node is None:
             return None
+        if type(node) is ast.Name:
+            # Identifiers are already interned by the parser
+            return node.id
+        simple = self._simple_expr_str(node)
+        if simple is not None:
+            return sys.intern(simple)
+        if type(node) is ast.Constant and type(node.value) is str:
+            # Forward references, e.g. x: "MyType" = dspy.InputField()
+            return sys.intern(repr(node.value))
         try:
             # Python 3.9+
-            return ast.unparse(node)  # type: ignore[attr-defined]
+            return sys.intern(ast.unparse(node))
         except Exception:
-            if isinstance(node, ast.Name):
-                return node.id
             return None
 
-    def _expr_to_text(self, node: Optional[ast.expr]) -> Optional[str]:
+    def _expr_to_text(self, node: ast.expr) -> Optional[str]:
         """
         Best-effort conversion of an expression to human-readable text.
-        Prefers raw string value for constants; falls back to ast.unparse.
         """
-        if node is None:
-            return None
-        if isinstance(node, ast.Constant) and isinstance(node.value, str):
-            return node.value
+        simple = self._simple_expr_str(node)
+        if simple is not None:
+            return simple
         try:
             # Python 3.9+
-            return ast.unparse(node)  # type: ignore[attr-defined]
+            return ast.unparse(node)
         except Exception:
-            if isinstance(node, ast.Name):
-                return node.id
             return None
 
     def _extract_field_description(self, call: ast.Call) -> Optional[str]:
@@ -226,7 +312,13 @@ class DSpyIntrospector(ast.NodeVisitor):
         # Check keyword arguments first
         for kw in call.keywords:
             if kw.arg in ("desc", "description"):
-                return self._expr_to_text(kw.value)
+                value = kw.value
+                # Inline the common desc="..." / desc=CONSTANT cases
+                if type(value) is ast.Constant and type(value.value) is str:
+                    return value.value
+                if type(value) is ast.Name:
+                    return value.id
+                return self._expr_to_text(value)
 
         # Fallback: first positional string literal (if any)
         for arg in call.args:
@@ -235,89 +327,145 @@ class DSpyIntrospector(ast.NodeVisitor):
 
         return None
 
+    # ------- Traversal ---------------------------------------------------
+
+    def visit(self, tree: ast.Module) -> None:
+        self.walk(tree.body)
+
+    def walk(self, body: List[ast.stmt]) -> None:
+        """
+        Visit a list of statements exactly once, dispatching on statement type.
+        Expressions are never descended into: signatures, modules and
+        predictions are only ever introduced by statements.
+        """
+        handlers = STMT_HANDLERS
+        for stmt in body:
+            handler = handlers.get(type(stmt))
+            if handler is not None:
+                handler(self, stmt)
+
+    def _handle_func(self, node: ast.FunctionDef) -> None:
+        # Keep descending so both `self.x = dspy.Predict(...)` in __init__ and
+        # `result = self.x(...)` in forward() are picked up.
+        self.walk(node.body)
+
+    def _handle_block(self, node: ast.stmt) -> None:
+        # if / for / while / with: body plus optional else-branch
+        self.walk(node.body)  # type: ignore[attr-defined]
+        self.walk(getattr(node, "orelse", []))
+
+    def _handle_try(self, node: ast.Try) -> None:
+        self.walk(node.body)
+        for handler in node.handlers:
+            self.walk(handler.body)
+        self.walk(node.orelse)
+        self.walk(node.finalbody)
+
+    def _handle_match(self, node: "ast.Match") -> None:
+        for case in node.cases:
+            self.walk(case.body)
+
     # ------- Visitors: Signatures ---------------------------------------
 
-    def visit_ClassDef(self, node: ast.ClassDef) -> None:
-        # Detect Signature subclasses
-        if any(self._is_dspy_signature_base(b) for b in node.bases):
-            inputs: List[FieldInfo] = []
-            outputs: List[FieldInfo] = []
-            class_doc = ast.get_docstring(node)
-
-            for stmt in node.body:
-                # field: str = dspy.InputField(...)
-                if isinstance(stmt, ast.AnnAssign) and isinstance(
-                    stmt.target, ast.Name
-                ):
-                    field_name = stmt.target.id
-                    kind: Optional[FieldKind] = None
-                    description: Optional[str] = None
-                    if stmt.value is not None:
-                        if self._is_input_field_call(stmt.value):
-                            kind = "input"
-                            if isinstance(stmt.value, ast.Call):
-                                description = self._extract_field_description(
-                                    stmt.value
-                                )
-                        elif self._is_output_field_call(stmt.value):
-                            kind = "output"
-                            if isinstance(stmt.value, ast.Call):
-                                description = self._extract_field_description(
-                                    stmt.value
-                                )
-
-                    if kind is not None:
-                        f = FieldInfo(
-                            name=field_name,
-                            kind=kind,
-                            annotation=self._annotation_str(stmt.annotation) or "Any",
-                            description=description,
-                        )
-                        if kind == "input":
-                            inputs.append(f)
-                        else:
-                            outputs.append(f)
-                # field = dspy.InputField(...)  (no annotation provided)
-                elif isinstance(stmt, ast.Assign):
-                    description: Optional[str] = None
-                    kind: Optional[FieldKind] = None
-                    value = stmt.value
-                    if value is not None:
-                        if self._is_input_field_call(value):
-                            kind = "input"
-                            if isinstance(value, ast.Call):
-                                description = self._extract_field_description(value)
-                        elif self._is_output_field_call(value):
-                            kind = "output"
-                            if isinstance(value, ast.Call):
-                                description = self._extract_field_description(value)
-                    if kind is not None:
-                        for tgt in stmt.targets:
-                            if isinstance(tgt, ast.Name):
-                                field_name = tgt.id
-                                f = FieldInfo(
-                                    name=field_name,
-                                    kind=kind,
-                                    annotation="Any",
-                                    description=description,
-                                )
-                                if kind == "input":
-                                    inputs.append(f)
-                                else:
-                                    outputs.append(f)
-
-            self.signatures[node.name] = SignatureInfo(
-                name=node.name,
-                inputs=inputs,
-                outputs=outputs,
-                docstring=class_doc,
+    def _annassign_fields(self, stmt: ast.AnnAssign) -> List[FieldInfo]:
+        """
+        field: str = dspy.InputField(...)
+        """
+        value = stmt.value
+        if type(stmt.target) is not ast.Name or type(value) is not ast.Call:
+            return []
+        kind = self._classify_field_call(value)
+        if kind is None:
+            return []
+        return [
+            FieldInfo(
+                name=stmt.target.id,
+                kind=kind,
+                annotation=self._annotation_str(stmt.annotation) or "Any",
+                description=self._extract_field_description(value),
             )
+        ]
 
-        self.generic_visit(node)
+    def _assign_fields(self, stmt: ast.Assign) -> List[FieldInfo]:
+        """
+        field = dspy.InputField(...)  (no annotation provided)
+        """
+        value = stmt.value
+        if type(value) is not ast.Call:
+            return []
+        kind = self._classify_field_call(value)
+        if kind is None:
+            return []
+        description = self._extract_field_description(value)
+        return [
+            FieldInfo(
+                name=tgt.id,
+                kind=kind,
+                annotation="Any",
+                description=description,
+            )
+            for tgt in stmt.targets
+            if isinstance(tgt, ast.Name)
+        ]
+
+    def _handle_class(self, node: ast.ClassDef) -> None:
+        # Detect Signature subclasses:
+        #   class X(dspy.Signature) or class X(Signature)
+        for base in node.bases:
+            if type(base) is ast.Attribute:
+                if base.attr == "Signature":
+                    break
+            elif type(base) is ast.Name and base.id == "Signature":
+                break
+        else:
+            self.walk(node.body)
+            return
+
+        inputs: List[FieldInfo] = []
+        outputs: List[FieldInfo] = []
+        class_doc = ast.get_docstring(node)
+
+        # One pass over the body: field declarations are collected, anything
+        # else (methods, nested classes, ...) is dispatched as usual.
+        field_handlers = FIELD_HANDLERS
+        handlers = STMT_HANDLERS
+        for stmt in node.body:
+            field_handler = field_handlers.get(type(stmt))
+            stmt_fields = field_handler(self, stmt) if field_handler is not None else []
+            if not stmt_fields:
+                handler = handlers.get(type(stmt))
+                if handler is not None:
+                    handler(self, stmt)
+                continue
+            for f in stmt_fields:
+                if f.kind == "input":
+                    inputs.append(f)
+                else:
+                    outputs.append(f)
+
+        self.signatures[node.name] = SignatureInfo(
+            name=node.name,
+            inputs=inputs,
+            outputs=outputs,
+            docstring=class_doc,
+        )
 
     # ------- Visitors: Modules & Predictions -----------------------------
 
-    def visit_Assign(self, node: ast.Assign) -> None:
+    def _handle_annassign(self, node: ast.AnnAssign) -> None:
+        """
+        Annotated bindings go through the same logic as plain ones, e.g.
+            self.predict: dspy.Module = dspy.Predict(MySignature)
+        """
+        if node.value is not None:
+            self._handle_binding(node, [node.target], node.value)
+
+    def _handle_assign(self, node: ast.Assign) -> None:
+        self._handle_binding(node, node.targets, node.value)
+
+    def _handle_binding(
+        self, node: ast.stmt, targets: List[ast.expr], call: ast.expr
+    ) -> None:
         """
         Handle both:
             my_predict = dspy.Predict(MySignature)
@@ -329,171 +477,321 @@ class DSpyIntrospector(ast.NodeVisitor):
         2) If RHS is a call to a known module variable (e.g. my_predict(...)),
            register a PredictionInfo (result variable -> Signature).
         """
+        if type(call) is not ast.Call:
+            return
+        func = call.func
+
+        # Base function name: dspy.Predict -> "Predict", Predict -> "Predict"
+        if type(func) is ast.Attribute:
+            func_name = func.attr
+        elif type(func) is ast.Name:
+            func_name = func.id
+        else:
+            return
+
         # Case 1: builder call -> module variable
-        if isinstance(node.value, ast.Call):
-            call = node.value
-            func = call.func
-
-            # Try to get base function name: dspy.Predict -> "Predict", Predict -> "Predict"
-            func_name: Optional[str] = None
-            if isinstance(func, ast.Attribute):
-                func_name = func.attr
-            elif isinstance(func, ast.Name):
-                func_name = func.id
-
-            if func_name in RECOGNIZED_DSPY_MODULES:
-                # e.g. dspy.Predict(MySignature)
-                if call.args:
-                    sig_expr = call.args[0]
-                    if isinstance(sig_expr, ast.Name):
-                        sig_name = sig_expr.id
-                        for target in node.targets:
-                            # Simple name on LHS
-                            if isinstance(target, ast.Name):
-                                var_name = target.id
-                                self.modules[var_name] = ModuleInfo(
-                                    name=var_name,
-                                    signature=sig_name,
-                                    line=node.lineno,
-                                    column=node.col_offset + 1,
-                                )
-                            # Attribute on LHS, e.g. self.predict = dspy.Predict(...)
-                            elif isinstance(target, ast.Attribute):
-                                # Store both short name ('predict') and dotted ('self.predict')
-                                short_name = target.attr
-                                dotted = self._safe_unparse(target) or short_name
-                                self.modules[short_name] = ModuleInfo(
-                                    name=short_name,
-                                    signature=sig_name,
-                                    line=node.lineno,
-                                    column=node.col_offset + 1,
-                                )
-                                self.modules[dotted] = ModuleInfo(
-                                    name=dotted,
-                                    signature=sig_name,
-                                    line=node.lineno,
-                                    column=node.col_offset + 1,
-                                )
-                    elif isinstance(sig_expr, ast.Constant) and isinstance(
-                        sig_expr.value, str
-                    ):
-                        # Inline signature string, e.g. "a, b: str -> c: int"
-                        inline_sig_text = sig_expr.value
-                        sig_info = self._parse_inline_signature(inline_sig_text)
-                        # Store under the raw inline string as the identifier
-                        self.signatures[sig_info.name] = sig_info
-                        for target in node.targets:
-                            if isinstance(target, ast.Name):
-                                var_name = target.id
-                                self.modules[var_name] = ModuleInfo(
-                                    name=var_name,
-                                    signature=sig_info.name,
-                                    line=node.lineno,
-                                    column=node.col_offset + 1,
-                                )
-                            elif isinstance(target, ast.Attribute):
-                                short_name = target.attr
-                                dotted = self._safe_unparse(target) or short_name
-                                self.modules[short_name] = ModuleInfo(
-                                    name=short_name,
-                                    signature=sig_info.name,
-                                    line=node.lineno,
-                                    column=node.col_offset + 1,
-                                )
-                                self.modules[dotted] = ModuleInfo(
-                                    name=dotted,
-                                    signature=sig_info.name,
-                                    line=node.lineno,
-                                    column=node.col_offset + 1,
-                                )
-
-            # Case 2: prediction variable: result = my_predict(...)
-            # Here func is typically a Name like "my_predict"
-            if isinstance(func, ast.Name) or isinstance(func, ast.Attribute):
-                candidates: List[str] = []
-                if isinstance(func, ast.Name):
-                    candidates.append(func.id)
-                else:
-                    # Attribute call like self.predict(...)
-                    dotted = self._safe_unparse(func)
-                    if dotted:
-                        candidates.append(dotted)
-                    # Also consider short name 'predict'
-                    candidates.append(func.attr)
-
-                sig_name: Optional[str] = None
-                for cand in candidates:
-                    if cand in self.modules:
-                        sig_name = self.modules[cand].signature
-                        break
-
-                if sig_name:
-                    for target in node.targets:
-                        if isinstance(target, ast.Name):
-                            var_name = target.id
-                            self.predictions[var_name] = PredictionInfo(
-                                name=var_name,
-                                signature=sig_name,
-                                line=node.lineno,
-                                column=node.col_offset + 1,
-                            )
-
-        self.generic_visit(node)
+        if func_name in RECOGNIZED_DSPY_MODULES:
+            # e.g. dspy.Predict(MySignature)
+            if not call.args:
+                return
+            sig_expr = call.args[0]
+            if type(sig_expr) is ast.Name:
+                self._register_module(node, targets, sig_expr.id)
+            elif type(sig_expr) is ast.Constant and type(sig_expr.value) is str:
+                # Inline signature string, e.g. "a, b: str -> c: int"
+                sig_info = self._parse_inline_signature(sig_expr.value)
+                # Store under the raw inline string as the identifier
+                self.signatures[sig_info.name] = sig_info
+                self._register_module(node, targets, sig_info.name)
+            return
+
+        # Case 2: prediction variable: result = my_predict(...)
+        # Every module is registered under its bare name (attribute targets
+        # under both 'predict' and 'self.predict'), so an unknown bare name
+        # rules the call out before any dotted name is built.
+        modules = self.modules
+        mod = modules.get(func_name)
+        if mod is None:
+            return
+        if type(func) is ast.Attribute:
+            # Attribute call like self.predict(...): prefer the exact dotted match
+            dotted = self._safe_unparse(func)
+            if dotted and dotted in modules:
+                mod = modules[dotted]
+
+        sig_name = mod.signature
+
+        if sig_name:
+            for target in targets:
+                for var_name in self._target_names(target):
+                    self.predictions[var_name] = PredictionInfo(
+                        name=var_name,
+                        signature=sig_name,
+                        line=node.lineno,
+                        column=node.col_offset + 1,
+                    )
+
+    def _target_names(self, target: ast.expr) -> List[str]:
+        """
+        Keys to register an assignment target under:
+            x = ...       -> ["x"]
+            self.x = ...  -> ["x", "self.x"]  (short and dotted)
+        """
+        if type(target) is ast.Name:
+            return [target.id]
+        if type(target) is ast.Attribute:
+            short_name = target.attr
+            return [short_name, self._safe_unparse(target) or short_name]
+        return []
+
+    def _register_module(
+        self, node: ast.stmt, targets: List[ast.expr], sig_name: str
+    ) -> None:
+        """
+        Register every assignment target of a builder call as a module.
+        """
+        for target in targets:
+            for var_name in self._target_names(target):
+                self.modules[var_name] = ModuleInfo(
+                    name=var_name,
+                    signature=sig_name,
+                    line=node.lineno,
+                    column=node.col_offset + 1,
+                )
+
+
+# Dispatch tables, keyed by exact statement type. Kept at module level (not
+# as class attributes) so the module stays compilable with mypyc.
+STMT_HANDLERS: Dict[type, Callable[[DSpyIntrospector, Any], None]] = {
+    ast.ClassDef: DSpyIntrospector._handle_class,
+    ast.Assign: DSpyIntrospector._handle_assign,
+    ast.AnnAssign: DSpyIntrospector._handle_annassign,
+    ast.FunctionDef: DSpyIntrospector._handle_func,
+    ast.AsyncFunctionDef: DSpyIntrospector._handle_func,
+    ast.If: DSpyIntrospector._handle_block,
+    ast.For: DSpyIntrospector._handle_block,
+    ast.AsyncFor: DSpyIntrospector._handle_block,
+    ast.While: DSpyIntrospector._handle_block,
+    ast.With: DSpyIntrospector._handle_block,
+    ast.AsyncWith: DSpyIntrospector._handle_block,
+    ast.Try: DSpyIntrospector._handle_try,
+}
+if sys.version_info >= (3, 10):
+    STMT_HANDLERS[ast.Match] = DSpyIntrospector._handle_match
+if sys.version_info >= (3, 11):
+    STMT_HANDLERS[ast.TryStar] = DSpyIntrospector._handle_try
+
+FIELD_HANDLERS: Dict[type, Callable[[DSpyIntrospector, Any], List[FieldInfo]]] = {
+    ast.AnnAssign: DSpyIntrospector._annassign_fields,
+    ast.Assign: DSpyIntrospector._assign_fields,
+}
+
+
+# ------- Result cache ----------------------------------------------------
+
+# The IDE re-runs this script on every (debounced) edit, so results are cached
+# on disk keyed by the file's mtime and size. The key also includes this
+# script's own stat so an upgraded introspector never serves stale results.
+# The cache lives in a private per-user directory: entries are trusted as-is.
+CACHE_DIR = (
+    pathlib.Path(os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache")
+    / "dspy_sig_introspect"
+)
+CACHE_MAX_ENTRIES = 256
+# Eviction is checked on a fraction of stores only and trims once this many
+# entries beyond the cap have accumulated, keeping the directory scan and
+# stats off the common store path.
+CACHE_EVICT_CHANCE = 1 / 16
+CACHE_EVICT_SLACK = 64
+
+
+def _cache_key(st: os.stat_result) -> str:
+    try:
+        self_st = os.stat(__file__)
+        self_key = f"{self_st.st_mtime_ns}-{self_st.st_size}"
+    except OSError:
+        self_key = "0"
+    return f"{st.st_mtime_ns}-{st.st_size}-{self_key}"
+
+
+def _cache_path(path: pathlib.Path) -> pathlib.Path:
+    # fsencode round-trips names that are not valid UTF-8 (surrogate escapes)
+    digest = hashlib.blake2b(os.fsencode(path), digest_size=16).hexdigest()
+    return CACHE_DIR / f"{digest}.json"
+
+
+def _cache_load(cache_path: pathlib.Path, key: str) -> Optional[str]:
+    """
+    Return the cached JSON payload if the entry matches `key`, else None.
+    """
+    try:
+        cached_key, payload = cache_path.read_text(encoding="utf-8").split("\n", 1)
+    except (OSError, ValueError):
+        return None
+    if cached_key != key:
+        return None
+    try:
+        # Refresh the entry's timestamps so eviction behaves like an LRU
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return payload
+
+
+def _cache_store(cache_path: pathlib.Path, key: str, payload: str) -> None:
+    """
+    Atomically write a cache entry and evict the least recently used ones.
+    Failures are ignored: the cache is purely an optimization.
+    """
+    tmp_name: Optional[str] = None
+    try:
+        CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(key + "\n" + payload)
+        os.replace(tmp_name, cache_path)
+    except Exception:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+        return
+
+    if random.random() < CACHE_EVICT_CHANCE:
+        _cache_evict()
+
+
+def _cache_evict() -> None:
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            entries = [entry for entry in it if entry.name.endswith(".json")]
+        if len(entries) <= CACHE_MAX_ENTRIES + CACHE_EVICT_SLACK:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+        for stale in entries[CACHE_MAX_ENTRIES:]:
+            os.unlink(stale.path)
+    except OSError:
+        pass
 
 
 # ------- CLI -------------------------------------------------------------
 
+JSON_SEPARATORS = (",", ":")
 
-def main() -> int:
-    if len(sys.argv) != 2:
-        print("Usage: dspy_sig_introspect.py <file.py>", file=sys.stderr)
-        return 1
 
-    filename = sys.argv[1]
-    path = pathlib.Path(filename).resolve()
+def _write_payload(payload: str) -> None:
+    # Payloads are ASCII-only JSON (non-ASCII text, including lone surrogates
+    # from string escapes, is \u-escaped), so any console encoding is safe.
+    sys.stdout.write(payload + "\n")
+    sys.stdout.flush()
 
+
+def _empty_payload(path: pathlib.Path) -> str:
+    return json.dumps(
+        {"file": str(path), "signatures": {}, "modules": {}, "predictions": {}},
+        separators=JSON_SEPARATORS,
+    )
+
+
+def introspect_path(path: pathlib.Path) -> str:
+    """
+    Introspect one (resolved) file and return its JSON payload.
+    """
     try:
-        text = path.read_text(encoding="utf-8")
+        st = os.stat(path)
     except FileNotFoundError:
-        print(
-            json.dumps(
-                {"file": str(path), "signatures": {}, "modules": {}, "predictions": {}}
-            )
-        )
-        return 0
+        return _empty_payload(path)
 
+    cache_path: Optional[pathlib.Path]
     try:
-        tree = ast.parse(text, filename=str(path))
-    except SyntaxError:
-        # If the file is currently half-typed / invalid, just return empty
-        print(
-            json.dumps(
-                {"file": str(path), "signatures": {}, "modules": {}, "predictions": {}}
-            )
-        )
-        return 0
+        key = _cache_key(st)
+        cache_path = _cache_path(path)
+        cached = _cache_load(cache_path, key)
+    except Exception:
+        # The cache is purely an optimization: never let it block a result
+        key, cache_path, cached = "", None, None
+    if cached is not None:
+        return cached
+
+    # Raw bytes go straight to the C tokenizer (which honours PEP 263 coding
+    # cookies and BOMs), saving a full decode of the file.
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return _empty_payload(path)
+
+    if not any(marker in data for marker in PREFILTER_MARKERS):
+        # Not a DSPy file: skip the (comparatively expensive) parse
+        return _empty_payload(path)
+
+    # A single C-level ast.parse serves signatures, modules and predictions
+    # alike. A tokenize-based pre-scan for Signature classes would be extra
+    # work, not less: the tokenize module is pure Python before 3.12 and
+    # measures about 2x slower than a full ast.parse of the same source.
+    try:
+        tree = ast.parse(data, filename=str(path))
+    except (SyntaxError, ValueError):
+        # If the file is currently half-typed / invalid (or undecodable, or
+        # contains null bytes), just return empty
+        return _empty_payload(path)
 
     visitor = DSpyIntrospector(str(path))
     visitor.visit(tree)
 
+    # Explicit per-class to_dict() literals: several times faster than a
+    # generic field walk (and dataclasses.asdict deep-copies every value)
     result = {
         "file": str(path),
-        "signatures": {
-            name: {
-                "name": sig.name,
-                "docstring": sig.docstring,
-                "inputs": [asdict(f) for f in sig.inputs],
-                "outputs": [asdict(f) for f in sig.outputs],
-            }
-            for name, sig in visitor.signatures.items()
-        },
-        "modules": {name: asdict(mod) for name, mod in visitor.modules.items()},
+        "signatures": {name: sig.to_dict() for name, sig in visitor.signatures.items()},
+        "modules": {name: mod.to_dict() for name, mod in visitor.modules.items()},
         "predictions": {
-            name: asdict(pred) for name, pred in visitor.predictions.items()
+            name: pred.to_dict() for name, pred in visitor.predictions.items()
         },
     }
 
-    print(json.dumps(result))
+    # Encoded once: the same payload is both cached and written out
+    payload = json.dumps(result, separators=JSON_SEPARATORS)
+    if cache_path is not None:
+        _cache_store(cache_path, key, payload)
+    return payload
+
+
+def serve() -> int:
+    """
+    Long-running mode used by the extension: read one file path per line on
+    stdin and answer each with exactly one line of JSON on stdout. This keeps
+    interpreter startup off the per-edit path.
+    """
+    for raw in sys.stdin.buffer:
+        # Undecodable bytes are kept as surrogate escapes, the same way
+        # os.fsdecode names such files, so decoding itself cannot fail
+        filename = raw.decode("utf-8", "surrogateescape").rstrip("\r\n")
+        if not filename:
+            continue
+        path = pathlib.Path(filename)
+        try:
+            path = path.resolve()
+            payload = introspect_path(path)
+        except Exception:
+            # Never let one bad file desynchronize the request/response stream
+            traceback.print_exc(file=sys.stderr)
+            sys.stderr.flush()
+            payload = _empty_payload(path)
+        _write_payload(payload)
+    return 0
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print("Usage: dspy_sig_introspect.py <file.py> | --server", file=sys.stderr)
+        return 1
+
+    if sys.argv[1] == "--server":
+        return serve()
+
+    path = pathlib.Path(sys.argv[1]).resolve()
+    _write_payload(introspect_path(path))
     return 0
 
 
@@ -48,11 +48,9 @@ export function activate(context: vscode.ExtensionContext) {
   let pythonPath: string | null = null;
 
   // Setup introspector (debounced) now so it's available during init
-  const { scheduleIntrospect } = createIntrospector(
-    () => pythonPath,
-    scriptPath,
-    log
-  );
+  const { scheduleIntrospect, dispose: disposeIntrospector } =
+    createIntrospector(() => pythonPath, scriptPath, log);
+  context.subscriptions.push({ dispose: disposeIntrospector });
 
   const initPython = async () => {
     try {
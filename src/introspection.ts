@@ -1,5 +1,5 @@
 import * as vscode from "vscode";
-import { execFileAsync } from "./utils";
+import { ChildProcessWithoutNullStreams, spawn } from "child_process";
 import { IntrospectionResult } from "./types";
 
 export const cache = new Map<string, IntrospectionResult>();
@@ -28,12 +28,118 @@ export async function getPythonPath(): Promise<string> {
   return process.platform === "win32" ? "python" : "python3";
 }
 
+const REQUEST_TIMEOUT_MS = 10000;
+
+interface PendingRequest {
+  resolve: (line: string) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+/**
+ * Keeps one `dspy_sig_introspect.py --server` process alive so each edit
+ * costs a line on stdin instead of a fresh Python interpreter. Requests are
+ * answered in order, one JSON line each.
+ */
+class IntrospectionServer {
+  private proc: ChildProcessWithoutNullStreams | null = null;
+  private procPythonPath: string | null = null;
+  private queue: PendingRequest[] = [];
+
+  constructor(
+    private readonly scriptPath: string,
+    private readonly log: (message: string) => void
+  ) {}
+
+  request(pythonPath: string, fileName: string): Promise<string> {
+    const proc = this.ensureStarted(pythonPath);
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        // A stuck server would stall every later request: restart it
+        this.log(`Introspection server timed out on ${fileName}; restarting`);
+        this.stop();
+      }, REQUEST_TIMEOUT_MS);
+      this.queue.push({ resolve, reject, timer });
+      proc.stdin.write(`${fileName}\n`);
+    });
+  }
+
+  stop() {
+    const proc = this.proc;
+    this.proc = null;
+    this.procPythonPath = null;
+    this.failPending(new Error("introspection server stopped"));
+    proc?.kill();
+  }
+
+  private ensureStarted(pythonPath: string): ChildProcessWithoutNullStreams {
+    if (this.proc && this.procPythonPath === pythonPath) {
+      return this.proc;
+    }
+    this.stop();
+
+    this.log(`Starting introspection server with ${pythonPath}`);
+    const proc = spawn(pythonPath, [this.scriptPath, "--server"], {
+      cwd: vscode.workspace.workspaceFolders?.[0]?.uri.fsPath,
+    });
+    proc.stdout.setEncoding("utf8");
+    proc.stderr.setEncoding("utf8");
+    // Line buffer is per process: output still in a stopped process's pipe
+    // must never be matched against the next process's requests.
+    let buffer = "";
+    proc.stdout.on("data", (chunk: string) => {
+      if (this.proc !== proc) {
+        return;
+      }
+      buffer += chunk;
+      let newline: number;
+      while ((newline = buffer.indexOf("\n")) >= 0) {
+        const line = buffer.slice(0, newline);
+        buffer = buffer.slice(newline + 1);
+        const pending = this.queue.shift();
+        if (pending) {
+          clearTimeout(pending.timer);
+          pending.resolve(line);
+        }
+      }
+    });
+    proc.stderr.on("data", (chunk: string) => this.log(`stderr: ${chunk}`));
+    const onExit = (reason: string) => {
+      if (this.proc !== proc) {
+        return;
+      }
+      this.log(`Introspection server exited (${reason})`);
+      this.proc = null;
+      this.procPythonPath = null;
+      this.failPending(new Error(`introspection server exited (${reason})`));
+    };
+    proc.on("error", (error) => onExit(error.message));
+    proc.on("exit", (code, signal) => onExit(`code ${code ?? signal}`));
+    // Writes racing a crashed process surface here; the exit handler reports
+    proc.stdin.on("error", () => undefined);
+
+    this.proc = proc;
+    this.procPythonPath = pythonPath;
+    return proc;
+  }
+
+  private failPending(error: Error) {
+    const queue = this.queue;
+    this.queue = [];
+    for (const pending of queue) {
+      clearTimeout(pending.timer);
+      pending.reject(error);
+    }
+  }
+}
+
 export function createIntrospector(
   getPythonPathRef: () => string | null,
   scriptPath: string,
   log: (message: string) => void
 ) {
   const pending = new Map<string, NodeJS.Timeout>();
+  const server = new IntrospectionServer(scriptPath, log);
 
   const introspectDocument = async (doc: vscode.TextDocument) => {
     if (doc.languageId !== "python") {
@@ -46,17 +152,7 @@ export function createIntrospector(
     }
     log(`Running DSPy introspector for ${doc.fileName}`);
     try {
-      const { stdout, stderr } = await execFileAsync(
-        pythonPath,
-        [scriptPath, doc.fileName],
-        {
-          cwd: vscode.workspace.workspaceFolders?.[0]?.uri.fsPath,
-          timeout: 10000,
-        }
-      );
-      if (stderr) {
-        log(`stderr: ${stderr}`);
-      }
+      const stdout = await server.request(pythonPath, doc.fileName);
       const result = JSON.parse(stdout) as IntrospectionResult;
       cache.set(doc.uri.toString(), result);
       log(
@@ -85,5 +181,13 @@ export function createIntrospector(
     pending.set(key, handle);
   };
 
-  return { scheduleIntrospect, introspectDocument };
+  const dispose = () => {
+    for (const handle of pending.values()) {
+      clearTimeout(handle);
+    }
+    pending.clear();
+    server.stop();
+  };
+
+  return { scheduleIntrospect, introspectDocument, dispose };
 }
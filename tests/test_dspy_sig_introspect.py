@@ -0,0 +1,397 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import dspy_sig_introspect as introspect  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(introspect, "CACHE_DIR", path)
+    return path
+
+
+# ------- Result cache ----------------------------------------------------
+
+
+def test_cache_store_failure_leaves_no_temp_file(cache_dir):
+    entry = introspect._cache_path(pathlib.Path("/some/file.py"))
+    # Lone surrogates cannot be encoded as UTF-8
+    introspect._cache_store(entry, "key", "bad \ud800 payload")
+
+    assert not entry.exists()
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_cache_round_trip(cache_dir):
+    entry = introspect._cache_path(pathlib.Path("/some/file.py"))
+    introspect._cache_store(entry, "key", '{"a":1}')
+
+    assert introspect._cache_load(entry, "key") == '{"a":1}'
+    assert introspect._cache_load(entry, "other-key") is None
+    assert list(cache_dir.glob("*.tmp")) == []
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX permissions")
+def test_cache_dir_is_private(cache_dir):
+    entry = introspect._cache_path(pathlib.Path("/some/file.py"))
+    introspect._cache_store(entry, "key", "{}")
+
+    assert cache_dir.stat().st_mode & 0o077 == 0
+
+
+def test_cache_eviction_waits_for_slack_then_trims(cache_dir, monkeypatch):
+    monkeypatch.setattr(introspect, "CACHE_MAX_ENTRIES", 4)
+    monkeypatch.setattr(introspect, "CACHE_EVICT_SLACK", 2)
+    monkeypatch.setattr(introspect, "CACHE_EVICT_CHANCE", 1.0)
+
+    for i in range(6):
+        introspect._cache_store(cache_dir / f"{i}.json", "key", "{}")
+    assert len(list(cache_dir.glob("*.json"))) == 6
+
+    introspect._cache_store(cache_dir / "6.json", "key", "{}")
+    assert len(list(cache_dir.glob("*.json"))) == 4
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs non-UTF-8 file names")
+def test_cache_handles_non_utf8_file_names(tmp_path, cache_dir):
+    # Undecodable bytes in a name surface as lone surrogates (surrogateescape)
+    path = tmp_path / os.fsdecode(b"bad\xff.py")
+    path.write_text("import dspy\nm = dspy.Predict('q -> a')\n", encoding="utf-8")
+
+    # Second call is served from the cache
+    for _ in range(2):
+        result = json.loads(introspect.introspect_path(path))
+        assert list(result["modules"]) == ["m"]
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+
+def test_cache_failure_still_returns_result(tmp_path, monkeypatch):
+    def broken(path):
+        raise RuntimeError("cache unavailable")
+
+    monkeypatch.setattr(introspect, "_cache_path", broken)
+    path = tmp_path / "module.py"
+    path.write_text("import dspy\nm = dspy.Predict('q -> a')\n", encoding="utf-8")
+
+    assert list(json.loads(introspect.introspect_path(path))["modules"]) == ["m"]
+
+
+# ------- Signatures ------------------------------------------------------
+
+
+def test_info_classes_are_slotted():
+    field = introspect.FieldInfo("a", "input", None, None)
+    infos = [
+        field,
+        introspect.SignatureInfo("Sig", [field], [], None),
+        introspect.ModuleInfo("m", "Sig", 1, 1),
+        introspect.PredictionInfo("p", "Sig", 1, 1),
+    ]
+
+    for info in infos:
+        assert not hasattr(info, "__dict__")
+
+
+def _introspect(tmp_path, source):
+    path = tmp_path / "module.py"
+    path.write_text(source, encoding="utf-8")
+    return json.loads(introspect.introspect_path(path.resolve()))
+
+
+def _annotations(fields):
+    return [(f["name"], f["annotation"]) for f in fields]
+
+
+def test_class_field_annotations(tmp_path):
+    result = _introspect(
+        tmp_path,
+        "import dspy\n"
+        "class Sig(dspy.Signature):\n"
+        "    a: str = dspy.InputField()\n"
+        "    b: 'Fwd' = dspy.InputField()\n"
+        "    c: typing.List[int] = dspy.InputField()\n"
+        "    d: ... = dspy.InputField()\n"
+        "    e: 1e999 = dspy.OutputField()\n",
+    )
+
+    sig = result["signatures"]["Sig"]
+    assert _annotations(sig["inputs"]) == [
+        ("a", "str"),
+        ("b", "'Fwd'"),
+        ("c", "typing.List[int]"),
+        ("d", "..."),
+    ]
+    assert _annotations(sig["outputs"]) == [("e", "1e309")]
+
+
+def test_field_descriptions(tmp_path):
+    result = _introspect(
+        tmp_path,
+        "import dspy\n"
+        "class Sig(dspy.Signature):\n"
+        "    a = dspy.InputField(desc='literal')\n"
+        "    b = dspy.InputField(desc=DESC)\n"
+        "    c = dspy.InputField(description=consts.DESC)\n"
+        "    d = dspy.InputField(desc=make_desc('x'))\n"
+        "    e = dspy.OutputField('positional')\n",
+    )
+
+    sig = result["signatures"]["Sig"]
+    assert [f["description"] for f in sig["inputs"] + sig["outputs"]] == [
+        "literal",
+        "DESC",
+        "consts.DESC",
+        "make_desc('x')",
+        "positional",
+    ]
+
+
+@pytest.mark.parametrize(
+    "side, expected",
+    [
+        ("a, b", [("a", "Any"), ("b", "Any")]),
+        ("a: str, b: int", [("a", "str"), ("b", "int")]),
+        ("a, b: str", [("a", "str"), ("b", "str")]),
+        ("c, d: str, e", [("c", "str"), ("d", "str"), ("e", "Any")]),
+        ("output: str, answer", [("output", "str"), ("answer", "Any")]),
+        (
+            "name, age: int, city: str",
+            [("name", "Any"), ("age", "int"), ("city", "str")],
+        ),
+        ("q: dict[str, int]", [("q", "dict[str, int]")]),
+        (
+            "q: dict[list[int], str], r",
+            [("q", "dict[list[int], str]"), ("r", "Any")],
+        ),
+        (
+            "q: dict[str, list[int]], r: int",
+            [("q", "dict[str, list[int]]"), ("r", "int")],
+        ),
+        ("a, b:", [("a", "Any"), ("b", "Any")]),
+        # Names are kept whole, with or without brackets on the side
+        ("élan: str, b", [("élan", "str"), ("b", "Any")]),
+        ("a.b: str", [("a.b", "str")]),
+        ("a b: str", [("a b", "str")]),
+        ("a.b: list[str], c", [("a.b", "list[str]"), ("c", "Any")]),
+    ],
+)
+def test_inline_signature_side(side, expected):
+    sig = introspect.DSpyIntrospector("x")._parse_inline_signature(f"{side} -> out")
+
+    assert _annotations(f.to_dict() for f in sig.inputs) == expected
+    assert _annotations(f.to_dict() for f in sig.outputs) == [("out", "Any")]
+
+
+def _introspect_bytes(tmp_path, data):
+    path = tmp_path / "module.py"
+    path.write_bytes(data)
+    return json.loads(introspect.introspect_path(path.resolve()))
+
+
+def test_coding_cookie_is_honoured(tmp_path):
+    result = _introspect_bytes(
+        tmp_path,
+        (
+            "# -*- coding: latin-1 -*-\n"
+            "import dspy\n"
+            "class Sig(dspy.Signature):\n"
+            '    """Résumé"""\n'
+            "    q = dspy.InputField(desc='café')\n"
+        ).encode("latin-1"),
+    )
+
+    sig = result["signatures"]["Sig"]
+    assert sig["docstring"] == "Résumé"
+    assert sig["inputs"][0]["description"] == "café"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"import dspy\nclass Sig(dspy.Signature):\n    q = dspy.InputField()\0\n",
+        b'import dspy\nclass Sig(dspy.Signature):\n    """\xff"""\n',
+    ],
+    ids=["null-byte", "undecodable"],
+)
+def test_unparsable_bytes_give_empty_result(tmp_path, data):
+    result = _introspect_bytes(tmp_path, data)
+
+    assert result["signatures"] == {}
+    assert result["modules"] == {}
+    assert result["predictions"] == {}
+
+
+# ------- Modules & predictions -------------------------------------------
+
+
+def _signatures_by_name(infos):
+    return {name: info["signature"] for name, info in infos.items()}
+
+
+def test_module_and_prediction_bindings(tmp_path):
+    result = _introspect(
+        tmp_path,
+        "import dspy\n"
+        "class Sig(dspy.Signature):\n"
+        "    q = dspy.InputField()\n"
+        "    a = dspy.OutputField()\n"
+        "\n"
+        "typed: dspy.Module = dspy.Predict(Sig)\n"
+        "inline = dspy.ChainOfThought('q -> a')\n"
+        "Predict = dspy.Predict(Sig)\n"
+        "\n"
+        "class Prog(dspy.Module):\n"
+        "    def __init__(self):\n"
+        "        self.gen = dspy.Predict(Sig)\n"
+        "\n"
+        "    def forward(self, q):\n"
+        "        self.last = self.gen(q=q)\n"
+        "        out: dspy.Prediction = typed(q=q)\n"
+        "        return inline(q=out.a)\n",
+    )
+
+    assert _signatures_by_name(result["modules"]) == {
+        "typed": "Sig",
+        "inline": "q -> a",
+        "Predict": "Sig",
+        "gen": "Sig",
+        "self.gen": "Sig",
+    }
+    # A builder call never also registers its target as a prediction
+    assert _signatures_by_name(result["predictions"]) == {
+        "last": "Sig",
+        "self.last": "Sig",
+        "out": "Sig",
+    }
+    assert result["modules"]["self.gen"] == {
+        "name": "self.gen",
+        "signature": "Sig",
+        "line": 12,
+        "column": 9,
+    }
+    assert "q -> a" in result["signatures"]
+
+
+def test_bindings_inside_control_flow(tmp_path):
+    result = _introspect(
+        tmp_path,
+        "import dspy\n"
+        "if __name__ == '__main__':\n"
+        "    m = dspy.Predict('q -> a')\n"
+        "    try:\n"
+        "        b = m(q=1)\n"
+        "    except ValueError:\n"
+        "        c = m(q=2)\n"
+        "    else:\n"
+        "        d = m(q=3)\n"
+        "    finally:\n"
+        "        e = m(q=4)\n"
+        "    with open('f') as fh:\n"
+        "        f = m(q=5)\n"
+        "    for _ in range(2):\n"
+        "        g = m(q=6)\n"
+        "    while True:\n"
+        "        h = m(q=7)\n",
+    )
+
+    assert _signatures_by_name(result["modules"]) == {"m": "q -> a"}
+    assert _signatures_by_name(result["predictions"]) == {
+        name: "q -> a" for name in "bcdefgh"
+    }
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="match needs Python 3.10+")
+def test_bindings_inside_match(tmp_path):
+    result = _introspect(
+        tmp_path,
+        "import dspy\n"
+        "m = dspy.Predict('q -> a')\n"
+        "match mode:\n"
+        "    case 'fast':\n"
+        "        b = m(q=1)\n"
+        "    case _:\n"
+        "        c = m(q=2)\n",
+    )
+
+    assert _signatures_by_name(result["predictions"]) == {"b": "q -> a", "c": "q -> a"}
+
+
+# ------- CLI -------------------------------------------------------------
+
+SCRIPT = pathlib.Path(introspect.__file__).resolve()
+SURROGATE_SOURCE = (
+    "import dspy\n"
+    "class Sig(dspy.Signature):\n"
+    '    """Caf\\u00e9"""\n'
+    '    q: str = dspy.InputField(desc="bad \\ud800 x")\n'
+)
+
+
+def _run(args, cache_dir, stdin=None):
+    env = dict(os.environ, XDG_CACHE_HOME=str(cache_dir))
+    return subprocess.run(
+        [sys.executable, str(SCRIPT), *args],
+        input=stdin,
+        capture_output=True,
+        env=env,
+        check=False,
+    )
+
+
+def _assert_surrogate_result(payload):
+    sig = json.loads(payload)["signatures"]["Sig"]
+    assert sig["docstring"] == "Café"
+    assert sig["inputs"][0]["description"] == "bad \ud800 x"
+
+
+def test_cli_handles_lone_surrogates(tmp_path, cache_dir):
+    source = tmp_path / "module.py"
+    source.write_text(SURROGATE_SOURCE, encoding="utf-8")
+
+    # Second run is served from the cache
+    for _ in range(2):
+        proc = _run([str(source)], cache_dir)
+        assert proc.returncode == 0, proc.stderr
+        assert proc.stdout.isascii()
+        _assert_surrogate_result(proc.stdout)
+
+
+def test_server_handles_lone_surrogates(tmp_path, cache_dir):
+    source = tmp_path / "module.py"
+    source.write_text(SURROGATE_SOURCE, encoding="utf-8")
+
+    request = f"{source}\n{source}\n".encode("utf-8")
+    proc = _run(["--server"], cache_dir, stdin=request)
+
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stderr == b""
+    lines = proc.stdout.decode("ascii").splitlines()
+    assert len(lines) == 2
+    for line in lines:
+        _assert_surrogate_result(line)
+
+
+def test_server_answers_every_request_line(tmp_path, cache_dir):
+    source = tmp_path / "module.py"
+    source.write_text(SURROGATE_SOURCE, encoding="utf-8")
+
+    missing = os.fsencode(tmp_path / "missing")
+    request = (
+        missing + b"\xff.py\n" + missing + b"\x00.py\n" + os.fsencode(source) + b"\n"
+    )
+    proc = _run(["--server"], cache_dir, stdin=request)
+
+    assert proc.returncode == 0, proc.stderr
+    lines = proc.stdout.decode("ascii").splitlines()
+    assert len(lines) == 3
+    for line in lines[:2]:
+        assert json.loads(line)["signatures"] == {}
+    _assert_surrogate_result(lines[2])